@@ -0,0 +1,101 @@
+# /media/bodega/procesador/scripts/bench_sales_aggregation.py
+"""
+Benchmark de la agregación de ventas: aggregate_sales (vectorizada) contra el groupby().apply() anterior.
+Antes verifica split_pair_series con celdas de número conocidas (código de país, separadores, números pegados).
+
+Uso:
+    python bench_sales_aggregation.py                      # 1M filas vectorizado, 50k filas con ambos métodos
+    python bench_sales_aggregation.py --legacy-rows 1000000 # compara ambos sobre el millón completo (tarda mucho)
+"""
+import argparse, time
+import numpy as np, pandas as pd
+from process_sales import aggregate_sales
+from phone_utils import split_pair_series
+
+# celda -> (principal, alterno) esperados; 0 = sin número válido
+PHONE_CELLS = {
+    '3055551234': (3055551234, 0),
+    '+1 305 555 1234': (3055551234, 0),
+    '13055551234 17865551234': (3055551234, 7865551234),
+    '30555512347865551234': (3055551234, 7865551234),
+    '(305) 555-1234 / 786-555-1234': (3055551234, 7865551234),
+    '1305555123417865551234': (3055551234, 7865551234),
+    '305-555-1234 ext 12': (3055551234, 0),
+    '123': (0, 0),
+}
+PROVIDERS = ['Constellation', 'Direct Energy', 'Just Energy', 'Spark', 'Verde', None]
+COMMODITIES = ['Electric', 'Gas', 'Electric and Gas']
+
+
+def synthetic_sales(rows, seed=7):
+    """Filas como las que produce la extracción de SalesProcessor; ~30% de los números se repiten."""
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(2_000_000_000, 9_999_999_999, size=int(rows * 0.7))
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1800, size=rows), unit='D')
+    df = pd.DataFrame({
+        'primary_number': rng.choice(numbers, size=rows),
+        'alternate_number': pd.array(np.where(rng.random(rows) < 0.2, rng.integers(2_000_000_000, 9_999_999_999, size=rows), 0), dtype='Int64'),
+        'sale_date': pd.Series(dates).mask(rng.random(rows) < 0.02),
+        'provider': pd.Series(rng.choice(np.array(PROVIDERS, dtype=object), size=rows)),
+        'commodity': rng.choice(COMMODITIES, size=rows),
+        'comments': None,
+    })
+    df['alternate_number'] = df['alternate_number'].mask(df['alternate_number'] == 0)
+    return df
+
+
+def legacy_aggregate_sales_data(group):
+    """Copia de la versión anterior (SalesProcessor.aggregate_sales_data) aplicada por grupo."""
+    sorted_group = group.sort_values(by='sale_date', ascending=True)
+    first_record = sorted_group.iloc[0]
+    final_provider = str(first_record['provider']) if pd.notna(first_record['provider']) else ""
+    for _, row in sorted_group.iloc[1:].iterrows():
+        provider_name = str(row['provider']) if pd.notna(row['provider']) else "N/A"
+        provider_date = row['sale_date'].strftime('%d/%m/%y') if pd.notna(row['sale_date']) else 'N/A'
+        final_provider += f" ({provider_name}: {provider_date})"
+    final_record = first_record.copy()
+    final_record['provider'] = final_provider
+    return final_record
+
+
+def legacy_aggregate(df):
+    return pd.DataFrame([legacy_aggregate_sales_data(group) for _, group in df.groupby('primary_number')]).reset_index(drop=True)
+
+
+def check_phone_pairs():
+    primary, alternate = split_pair_series(pd.Series(list(PHONE_CELLS)))
+    wrong = {cell: (int(p), int(a)) for cell, p, a in zip(PHONE_CELLS, primary, alternate) if (p, a) != PHONE_CELLS[cell]}
+    if wrong: raise AssertionError(f"split_pair_series no coincide: {wrong}")
+    print(f"split_pair_series: {len(PHONE_CELLS)} celdas conocidas correctas.")
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de agregación de ventas')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--legacy-rows', type=int, default=50_000, help='Filas para el método anterior (es lento)')
+    args = parser.parse_args()
+
+    check_phone_pairs()
+    df = synthetic_sales(args.rows)
+    result, seconds = timed(aggregate_sales, df)
+    print(f"vectorizado: {args.rows:,} filas -> {len(result):,} números en {seconds:.2f}s")
+
+    sample = df.head(args.legacy_rows)
+    new, new_seconds = timed(aggregate_sales, sample)
+    old, old_seconds = timed(legacy_aggregate, sample)
+    # El método anterior arma filas como Series (dtype object); se comparan valores con los tipos del resultado nuevo.
+    pd.testing.assert_frame_equal(new[old.columns], old.astype(new[old.columns].dtypes.to_dict()))
+    print(f"{args.legacy_rows:,} filas: anterior {old_seconds:.2f}s, vectorizado {new_seconds:.3f}s "
+          f"({old_seconds / max(new_seconds, 1e-9):.0f}x). Resultados idénticos.")
+    if args.legacy_rows < args.rows:
+        print(f"Estimado del método anterior para {args.rows:,} filas: ~{old_seconds * args.rows / args.legacy_rows:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# /media/bodega/procesador/scripts/bench_startup.py
+"""
+Tiempo de arranque de cada punto de entrada medido con `python -X importtime`, contra un presupuesto en ms.
+
+Cada entrada se importa en un intérprete nuevo (como lo hace start_processing con cada job); se toma la mediana de
+varias corridas del tiempo acumulado del módulo principal. Las dependencias pesadas (pandas, sqlalchemy, redis,
+selenium) se cargan al primer uso, así que un import que vuelva a traerlas al arranque salta aquí como fuera de
+presupuesto. El import de la app incluye la verificación del esquema al arrancar, así que conviene medirla con
+PostgreSQL disponible.
+
+Uso:
+    python bench_startup.py                 # todas las entradas, 5 corridas cada una
+    python bench_startup.py --runs 10 --verbose process_txt web_app.app
+Sale con código 1 si alguna entrada pasa de su presupuesto.
+"""
+import argparse, os, re, statistics, subprocess, sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SCRIPTS = os.path.join(ROOT, 'scripts')
+
+# módulo -> (directorio desde el que se importa, presupuesto en ms)
+BUDGETS_MS = {
+    'web_app.app': (ROOT, 800),
+    'web_app.lookup_service': (ROOT, 800),
+    'process_txt': (SCRIPTS, 250),
+    'process_xlsx': (SCRIPTS, 250),
+    'process_csv': (SCRIPTS, 250),
+    'process_sales': (SCRIPTS, 250),
+    'process_sales_csv': (SCRIPTS, 250),
+    'scrub_list': (SCRIPTS, 250),
+}
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def import_profile(module, cwd):
+    """Una corrida en un intérprete nuevo: (ms acumulados del módulo, [(ms, paquete)] de sus imports directos)."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import sys; sys.path.insert(0, "."); import {module}'],
+                          cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0: raise RuntimeError(f'import {module} falló:\n{proc.stderr[-2000:]}')
+    total, children = None, []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match: continue
+        cumulative, depth, name = int(match.group(2)) / 1000, len(match.group(3)) // 2, match.group(4)
+        if depth == 0 and name == module:
+            total = cumulative; break
+        # Los hijos se listan antes que el padre; los de primer nivel de la entrada quedan con sangría 1.
+        elif depth == 1: children.append((cumulative, name))
+        elif depth == 0: children = []
+    return total, sorted(children, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiempo de arranque por punto de entrada (-X importtime) contra presupuesto')
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS_MS))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--verbose', action='store_true', help='Muestra los imports directos más pesados de cada entrada')
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'entrada':<26}{'mediana ms':>12}{'presupuesto':>13}")
+    for module in args.modules:
+        cwd, budget = BUDGETS_MS[module]
+        runs = [import_profile(module, cwd) for _ in range(args.runs)]
+        median = statistics.median(total for total, _ in runs)
+        flag = '' if median <= budget else '  FUERA DE PRESUPUESTO'
+        print(f"{module:<26}{median:>12.0f}{budget:>13}{flag}")
+        if flag: over_budget.append(module)
+        if args.verbose:
+            for ms, name in runs[-1][1][:5]: print(f"    {ms:>8.0f}  {name}")
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == '__main__':
+    main()
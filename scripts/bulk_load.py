@@ -0,0 +1,79 @@
+# /media/bodega/procesador/scripts/bulk_load.py
+"""Helpers to stream rows into PostgreSQL with COPY FROM STDIN instead of one INSERT per row."""
+import io
+
+
+def _copy_value(value):
+    """Formats a single value for COPY's text format (\\N is NULL)."""
+    if value is None: return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Copies an iterable of tuples into `table` through a raw psycopg2 cursor. Returns the number of rows sent."""
+    buf, count = io.StringIO(), 0
+    for row in rows:
+        buf.write('\t'.join(_copy_value(v) for v in row)); buf.write('\n')
+        count += 1
+    if count:
+        buf.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+    return count
+
+
+def copy_numbers(cursor, table, column, numbers):
+    """Fast path for a single BIGINT column: `numbers` is a list or int64 array of phone numbers."""
+    if hasattr(numbers, 'tolist'): numbers = numbers.tolist()
+    if not numbers: return 0
+    buf = io.StringIO('\n'.join(map(str, numbers)) + '\n')
+    cursor.copy_expert(f"COPY {table} ({column}) FROM STDIN", buf)
+    return len(numbers)
+
+
+def copy_dataframe(cursor, table, df):
+    """Copies a DataFrame whose columns match `table` columns, using COPY's CSV format. NaN/None become NULL, '' stays ''."""
+    if df.empty: return 0
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep='\\N')
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf)
+    return len(df)
+
+
+def create_shadow_table(cursor, table):
+    """Creates an empty `{table}_new` with the live table's columns and defaults but no indexes, so the bulk load skips index maintenance."""
+    cursor.execute(f"DROP TABLE IF EXISTS {table}_new;")
+    cursor.execute(f"CREATE TABLE {table}_new (LIKE {table} INCLUDING DEFAULTS);")
+    cursor.connection.commit()
+
+
+def swap_shadow_table(cursor, table, key, lock_timeout='10s'):
+    """
+    Builds the primary key on the loaded `{table}_new` and swaps it in for `table`.
+    The swap is three renames and a DROP in one short transaction, so readers see either the old or the new table, never an empty one.
+    """
+    cursor.execute(f"ALTER TABLE {table}_new ADD CONSTRAINT {table}_new_pkey PRIMARY KEY ({key});")
+    cursor.execute(f"ANALYZE {table}_new;")
+    cursor.connection.commit()
+    cursor.execute(f"SET LOCAL lock_timeout = '{lock_timeout}';")
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old;")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table};")
+    cursor.execute(f"DROP TABLE {table}_old;")
+    cursor.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_new_pkey TO {table}_pkey;")
+    cursor.connection.commit()
+
+
+def reload_table(engine, table, key, df):
+    """Full reload through a shadow table: COPY `df` into `{table}_new`, index it and swap it in. Returns the rows loaded."""
+    raw_conn = engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        create_shadow_table(cursor, table)
+        copy_dataframe(cursor, f'{table}_new', df)
+        swap_shadow_table(cursor, table, key)
+        return len(df)
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
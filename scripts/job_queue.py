@@ -0,0 +1,174 @@
+# /media/bodega/procesador/scripts/job_queue.py
+"""
+Redis-backed queue of processing jobs, shared by the web app (enqueue) and job_worker.py (claim/finish).
+
+Keys:
+    jobs:queued        sorted set of queued job ids; lower score runs first (priority band, then arrival order)
+    jobs:specs         hash job_id -> JSON spec (file path, type, group, priority, attempts); lives until the job ends
+    jobs:running       hash job_id -> JSON {group, worker, started_at}
+    jobs:worker:<id>   heartbeat of a worker process (expires when the worker dies)
+    jobs:wakeup        list pushed on enqueue so an idle worker starts the job without waiting for its poll interval
+The queue does not depend on the job:<id> records (those expire with the job history), so a job survives restarts of the
+web app and of the workers. Jobs left in jobs:running by a worker whose heartbeat expired go back to the queue.
+
+Concurrency is limited per job group across all workers: ingests that write the same table never overlap.
+Each queued job's job:<id> record carries its queue_position.
+"""
+import json, os, logging
+from collections import Counter
+from datetime import datetime
+try:
+    from job_records import write_job
+except ImportError:  # imported by the web app as scripts.job_queue
+    from scripts.job_records import write_job
+
+QUEUE_KEY = 'jobs:queued'
+SPECS_KEY = 'jobs:specs'
+RUNNING_KEY = 'jobs:running'
+SEQ_KEY = 'jobs:seq'
+WAKEUP_KEY = 'jobs:wakeup'
+HEARTBEAT_TTL = 30
+MAX_ATTEMPTS = 3      # A job that keeps killing its worker is marked failed instead of requeued forever
+CLAIM_SCAN_DEPTH = 200
+
+PRIORITY_NORMAL, PRIORITY_HIGH, MAX_PRIORITY = 5, 8, 9
+# file_type -> job group; jobs of the same group write the same table
+JOB_GROUPS = {
+    'txt': 'dnc',
+    'suppression_xlsx': 'suppression', 'suppression_csv': 'suppression', 'suppression_csv_delta': 'suppression',
+    'sales_xlsx': 'sales', 'sales_csv': 'sales',
+    'scrub_list': 'scrub',
+}
+DEFAULT_LIMITS = {'dnc': 1, 'suppression': 1, 'sales': 1, 'scrub': 2}
+
+logger = logging.getLogger(__name__)
+
+
+def heartbeat_key(worker_id):
+    return f'jobs:worker:{worker_id}'
+
+
+def parse_limits(value):
+    """'dnc=1,scrub=3' -> DEFAULT_LIMITS with those groups overridden (JOB_CONCURRENCY env var)."""
+    limits = dict(DEFAULT_LIMITS)
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        group, _, limit = item.partition('=')
+        limits[group.strip()] = int(limit)
+    return limits
+
+
+def enqueue(redis_client, job_id, file_path, file_type, priority=PRIORITY_NORMAL):
+    """Adds a job to the queue. Returns its 1-based position."""
+    if file_type not in JOB_GROUPS: raise ValueError(f'Unknown file type: {file_type}')
+    priority = max(0, min(int(priority), MAX_PRIORITY))
+    score = (MAX_PRIORITY - priority) * 10**12 + redis_client.incr(SEQ_KEY)
+    spec = {'job_id': job_id, 'file_path': file_path, 'file_type': file_type, 'group': JOB_GROUPS[file_type],
+            'priority': priority, 'score': score, 'attempts': 0, 'enqueued_at': datetime.now().isoformat()}
+    pipe = redis_client.pipeline()
+    pipe.hset(SPECS_KEY, job_id, json.dumps(spec))
+    pipe.zadd(QUEUE_KEY, {job_id: score})
+    pipe.lpush(WAKEUP_KEY, job_id)
+    pipe.ltrim(WAKEUP_KEY, 0, 99)
+    pipe.execute()
+    return refresh_positions(redis_client).get(job_id)
+
+
+def refresh_positions(redis_client):
+    """
+    Writes queue_position into the job:<id> record of every queued job. Returns {job_id: position}.
+    WATCH on the queue: if a worker claims one of the jobs between the read and the writes, the writes are retried
+    without it instead of setting the claimed job back to queued.
+    """
+    from redis.exceptions import WatchError
+    with redis_client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(QUEUE_KEY)
+                queued = pipe.zrange(QUEUE_KEY, 0, -1)
+                positions = {job_id: i + 1 for i, job_id in enumerate(queued)}
+                pipe.multi()
+                for job_id, position in positions.items():
+                    write_job(redis_client, job_id, pipe, status='queued', queue_position=position, queue_length=len(queued),
+                              message=f'En cola: posición {position} de {len(queued)}')
+                pipe.execute()
+                return positions
+            except WatchError:
+                continue
+            except Exception as e:
+                logger.error(f"Could not update queue positions: {e}")
+                return {}
+
+
+def claim(redis_client, worker_id, limits):
+    """
+    Moves the first queued job whose group is under its concurrency limit to jobs:running and returns its spec,
+    or None. WATCH on the queue and the running set makes the check-and-move atomic across workers.
+    """
+    from redis.exceptions import WatchError
+    with redis_client.pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(QUEUE_KEY, RUNNING_KEY)
+                candidates = pipe.zrange(QUEUE_KEY, 0, CLAIM_SCAN_DEPTH - 1)
+                if not candidates:
+                    pipe.unwatch(); return None
+                running = Counter(json.loads(value)['group'] for value in pipe.hvals(RUNNING_KEY))
+                for job_id, raw in zip(candidates, pipe.hmget(SPECS_KEY, candidates)):
+                    spec = json.loads(raw) if raw else None
+                    if spec and running[spec['group']] >= limits.get(spec['group'], 1): continue
+                    pipe.multi()
+                    pipe.zrem(QUEUE_KEY, job_id)
+                    if spec:
+                        spec['attempts'] += 1
+                        pipe.hset(SPECS_KEY, job_id, json.dumps(spec))
+                        pipe.hset(RUNNING_KEY, job_id, json.dumps({'group': spec['group'], 'worker': worker_id, 'started_at': datetime.now().isoformat()}))
+                    pipe.execute()
+                    if spec: return spec
+                    break  # Queue entry without a spec: dropped, look again
+                else:
+                    pipe.unwatch(); return None
+            except WatchError:
+                continue
+
+
+def finish(redis_client, job_id):
+    """Removes a finished job and wakes a worker, since its group may have a job waiting on the limit."""
+    pipe = redis_client.pipeline()
+    pipe.hdel(RUNNING_KEY, job_id)
+    pipe.hdel(SPECS_KEY, job_id)
+    pipe.lpush(WAKEUP_KEY, job_id)
+    pipe.ltrim(WAKEUP_KEY, 0, 99)
+    pipe.execute()
+
+
+def recover_orphans(redis_client):
+    """Requeues (at their original position) running jobs whose worker stopped sending heartbeats. Returns the requeued ids."""
+    requeued = []
+    for job_id, raw in redis_client.hgetall(RUNNING_KEY).items():
+        if redis_client.exists(heartbeat_key(json.loads(raw)['worker'])): continue
+        spec = json.loads(redis_client.hget(SPECS_KEY, job_id) or 'null')
+        pipe = redis_client.pipeline()
+        pipe.hdel(RUNNING_KEY, job_id)
+        if spec and spec['attempts'] < MAX_ATTEMPTS:
+            pipe.zadd(QUEUE_KEY, {job_id: spec['score']})
+            requeued.append(job_id)
+        else:
+            pipe.hdel(SPECS_KEY, job_id)
+        pipe.execute()
+        if job_id not in requeued:
+            write_job(redis_client, job_id, status='failed', queue_position=None, message='El worker se detuvo durante el procesamiento demasiadas veces.')
+        logger.warning(f"Job {job_id} was running on a dead worker; {'requeued' if job_id in requeued else 'marked failed'}.")
+    if requeued: refresh_positions(redis_client)
+    return requeued
+
+
+def queue_snapshot(redis_client):
+    """Queued and running jobs, for the admin view."""
+    queued = redis_client.zrange(QUEUE_KEY, 0, -1)
+    specs = [json.loads(raw) for raw in redis_client.hmget(SPECS_KEY, queued) if raw] if queued else []
+    running = {job_id: json.loads(raw) for job_id, raw in redis_client.hgetall(RUNNING_KEY).items()}
+    return {
+        'queued': [{k: s[k] for k in ('job_id', 'file_type', 'group', 'priority', 'enqueued_at')} for s in specs],
+        'running': [{'job_id': job_id, **info} for job_id, info in running.items()],
+        'limits': parse_limits(os.environ.get('JOB_CONCURRENCY')),
+    }
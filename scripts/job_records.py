@@ -0,0 +1,217 @@
+# /media/bodega/procesador/scripts/job_records.py
+"""
+The job:<id> records that the admin pages and /api/progress read.
+
+A record is a Redis hash with one field per value (status, current, total, progress, message, rows_per_sec,
+eta_seconds, queue_position, ...), so writers set only the fields they own with HSET and never overwrite each
+other's, and readers get it back with one HGETALL. Numbers are stored as plain strings and converted back by field
+name; the few structured values (exports) are stored as JSON.
+Records are kept JOB_HISTORY_DAYS after their last write. register_job() adds a new job to the registry: jobs:index,
+a sorted set of job ids scored by registration time, plus one such set per file type (jobs:type:<type>) and per
+status (jobs:status:<status>, kept current by write_job). list_jobs() pages through them newest first, so the admin
+page never has to scan the keyspace.
+Every write is also published on job_progress:<id> as a JSON object of the changed fields (null = removed), which
+is what feeds the app's /api/progress/<id>/stream.
+
+ProgressReporter is what the processors use: it writes at most once per PROGRESS_INTERVAL seconds no matter how often
+a processor reports, keeps a smoothed throughput and ETA, and always writes final states immediately.
+"""
+import json, os, threading, time, logging
+from datetime import datetime
+
+JOB_HISTORY_DAYS = int(os.environ.get('JOB_HISTORY_DAYS', '30'))
+JOB_TTL = JOB_HISTORY_DAYS * 86400
+INDEX_KEY = 'jobs:index'
+STATUSES = ('queued', 'processing', 'completed', 'failed')
+LIST_SCAN_LIMIT = 500  # Index entries list_jobs() looks at per call when a combined filter matches few jobs
+PROGRESS_INTERVAL = float(os.environ.get('JOB_PROGRESS_INTERVAL', '1.0'))
+RATE_SMOOTHING = 0.3  # Weight of the newest sample in the throughput average
+INT_FIELDS = {'current', 'total', 'rows', 'eta_seconds', 'queue_position', 'queue_length', 'callable_count', 'blocked_count'}
+FLOAT_FIELDS = {'progress', 'rows_per_sec'}
+JSON_FIELDS = {'exports'}
+
+logger = logging.getLogger(__name__)
+
+
+def job_key(job_id):
+    return f'job:{job_id}'
+
+
+def progress_channel(job_id):
+    return f'job_progress:{job_id}'
+
+
+def type_index(file_type):
+    return f'jobs:type:{file_type}'
+
+
+def status_index(status):
+    return f'jobs:status:{status}'
+
+
+# Moves a registered job to the index of its new status, keeping its registration time as the score.
+# Jobs that were never registered (ids written before the registry existed) are left out.
+_SET_STATUS = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score then return 0 end
+for i = 3, #KEYS do redis.call('ZREM', KEYS[i], ARGV[1]) end
+redis.call('ZADD', KEYS[2], score, ARGV[1])
+return 1
+"""
+
+
+def encode_fields(fields):
+    """(values to HSET, fields to HDEL): None removes a field."""
+    values, removed = {}, []
+    for name, value in fields.items():
+        if value is None: removed.append(name)
+        elif name in JSON_FIELDS: values[name] = json.dumps(value)
+        else: values[name] = value if isinstance(value, str) else str(value)
+    return values, removed
+
+
+def decode_fields(raw):
+    job = {}
+    for name, value in raw.items():
+        try:
+            if name in INT_FIELDS: value = int(float(value))
+            elif name in FLOAT_FIELDS: value = float(value)
+            elif name in JSON_FIELDS: value = json.loads(value)
+        except ValueError:
+            pass
+        job[name] = value
+    return job
+
+
+def write_job(redis_client, job_id, pipe=None, /, **fields):
+    """
+    Sets the given fields of job:<id>, renews its TTL and publishes the change.
+    Pass `pipe` to queue the commands on an existing pipeline.
+    """
+    values, removed = encode_fields(fields)
+    target = pipe if pipe is not None else redis_client.pipeline(transaction=False)
+    if values: target.hset(job_key(job_id), mapping=values)
+    if removed: target.hdel(job_key(job_id), *removed)
+    target.expire(job_key(job_id), JOB_TTL)
+    if fields.get('status'):
+        others = [status_index(status) for status in STATUSES if status != fields['status']]
+        target.eval(_SET_STATUS, 2 + len(others), INDEX_KEY, status_index(fields['status']), *others, job_id)
+    target.publish(progress_channel(job_id), json.dumps(fields, default=str))
+    if pipe is None: target.execute()
+
+
+def register_job(redis_client, job_id, file_type, **fields):
+    """
+    Writes a new job's record and adds it to the registry (newest first in list_jobs). Registry entries older than
+    JOB_HISTORY_DAYS are dropped here, since their records have expired too.
+    """
+    now = time.time()
+    cutoff = now - JOB_TTL
+    pipe = redis_client.pipeline(transaction=False)
+    for key in (INDEX_KEY, type_index(file_type), *map(status_index, STATUSES)):
+        pipe.zremrangebyscore(key, '-inf', cutoff)
+    pipe.zadd(INDEX_KEY, {job_id: now})
+    pipe.zadd(type_index(file_type), {job_id: now})
+    write_job(redis_client, job_id, pipe, job_id=job_id, file_type=file_type, **fields)
+    pipe.execute()
+
+
+def list_jobs(redis_client, status=None, file_type=None, before=None, limit=20):
+    """
+    One page of registered jobs, newest first: (records, cursor for the next page or None).
+    `before` is the cursor returned by the previous page. Each index read is one ZREVRANGEBYSCORE plus one pipelined
+    HGETALL for the page, whatever the number of jobs in the registry.
+    """
+    # With one filter its own index is read; with both, the status index is read and the type checked on the records.
+    key = status_index(status) if status else type_index(file_type) if file_type else INDEX_KEY
+    jobs, scanned, expired = [], 0, []
+    cursor = before
+    while len(jobs) < limit and scanned < LIST_SCAN_LIMIT:
+        wanted = limit - len(jobs)
+        entries = redis_client.zrevrangebyscore(key, f'({cursor!r}' if cursor is not None else '+inf', '-inf', start=0, num=wanted, withscores=True)
+        for (job_id, _), job in zip(entries, read_jobs(redis_client, [job_id for job_id, _ in entries])):
+            if not job: expired.append(job_id)
+            elif not (status and file_type) or job.get('file_type') == file_type: jobs.append(job)
+        scanned += len(entries)
+        cursor = entries[-1][1] if len(entries) == wanted else None
+        if cursor is None: break
+    if expired:
+        # Records that expired or were deleted before their registry entry was pruned
+        pipe = redis_client.pipeline(transaction=False)
+        for index in (INDEX_KEY, key): pipe.zrem(index, *expired)
+        pipe.execute()
+    return jobs, cursor
+
+
+def read_job(redis_client, job_id):
+    """The decoded record, or {} when it doesn't exist (or expired)."""
+    return decode_fields(redis_client.hgetall(job_key(job_id)))
+
+
+def read_jobs(redis_client, job_ids):
+    """Several records with one round trip, in the same order (missing ones as {})."""
+    pipe = redis_client.pipeline(transaction=False)
+    for job_id in job_ids: pipe.hgetall(job_key(job_id))
+    return [decode_fields(raw) for raw in pipe.execute()]
+
+
+class ProgressReporter:
+    def __init__(self, redis_client, job_id, interval=PROGRESS_INTERVAL, current_is_rows=True):
+        self.redis, self.job_id, self.interval = redis_client, job_id, interval
+        self.current_is_rows = current_is_rows  # False when `current` counts something else (bytes of a DNC file)
+        self.lock = threading.Lock()
+        self.last_sent = 0.0
+        self.pending = None   # Newest fields not written yet
+        self.timer = None
+        self.sample = None    # (time, current, rows, total) of the previous update, for the throughput
+        self.current_rate = self.rows_rate = None
+
+    def update(self, current, total, status='processing', message=None, rows=None, **extra):
+        """
+        Reports progress. `current`/`total` drive the percentage and ETA (rows, bytes, or percentage points);
+        `rows` is the row count for rows_per_sec when `current` is not rows (the last one is kept when omitted).
+        Extra keyword fields are stored as-is.
+        Updates closer together than the interval are merged and written when it elapses.
+        """
+        now = time.monotonic()
+        if rows is None: rows = current if self.current_is_rows else (self.sample[2] if self.sample else 0)
+        fields = {'current': current, 'total': total, 'status': status, 'progress': round(current / total * 100, 2) if total > 0 else 0,
+                  'rows': rows, 'updated_at': datetime.now().isoformat(), **extra}
+        if message: fields['message'] = message
+        with self.lock:
+            self._measure(now, current, rows, total)
+            fields['rows_per_sec'] = round(self.rows_rate, 1) if self.rows_rate else 0
+            fields['eta_seconds'] = int((total - current) / self.current_rate) if self.current_rate and total > current and status == 'processing' else None
+            self.pending = {**(self.pending or {}), **fields}
+            if status != 'processing' or now - self.last_sent >= self.interval:
+                self._flush()
+            elif self.timer is None:
+                # Nothing else may come for a while (a long final step), so the merged update is written on a timer.
+                self.timer = threading.Timer(self.interval - (now - self.last_sent), self._flush_locked)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _measure(self, now, current, rows, total):
+        if self.sample is None or self.sample[3] != total or current < self.sample[1]:
+            # New phase (another total, or counting restarted): the old throughput no longer applies.
+            self.sample, self.current_rate, self.rows_rate = (now, current, rows, total), None, None
+            return
+        elapsed = now - self.sample[0]
+        if elapsed < 0.2: return
+        smooth = lambda old, new: new if old is None else RATE_SMOOTHING * new + (1 - RATE_SMOOTHING) * old
+        self.current_rate = smooth(self.current_rate, (current - self.sample[1]) / elapsed)
+        self.rows_rate = smooth(self.rows_rate, (rows - self.sample[2]) / elapsed)
+        self.sample = (now, current, rows, total)
+
+    def _flush_locked(self):
+        with self.lock: self._flush()
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel(); self.timer = None
+        if not self.pending: return
+        try:
+            write_job(self.redis, self.job_id, **self.pending)
+        except Exception as e:
+            logger.error(f"Error updating progress of job {self.job_id}: {e}")
+        self.pending, self.last_sent = None, time.monotonic()
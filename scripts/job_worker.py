@@ -0,0 +1,213 @@
+# /media/bodega/procesador/scripts/job_worker.py
+"""
+Worker service for the job queue (job_queue.py): claims queued uploads and runs their processor.
+
+Run one or more of these next to the web app (e.g. as a systemd service):
+    python job_worker.py --slots 3
+--slots caps the jobs this process runs at once. JOB_CONCURRENCY ('dnc=1,suppression=1,sales=1,scrub=2') caps each
+job group across every worker, so two ingests into the same table never run together. On SIGTERM/SIGINT the worker
+stops claiming and waits for its running jobs. If it is killed instead, another worker (or this one after a restart)
+requeues its jobs once the heartbeat expires.
+
+By default jobs run in warm processes: one resident process per slot imports every processor module, opens a small
+PostgreSQL pool and a Redis client, checks the tables once, and then runs each job's processor class in-process with
+those handles. A process is replaced after --max-jobs jobs to give its memory back. --mode subprocess runs each job
+as `python <script>` instead, as before.
+"""
+import argparse, importlib, json, multiprocessing, os, signal, socket, subprocess, sys, threading, time, uuid, logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from connections import create_redis, create_db_engine
+import job_queue
+from job_records import read_job, write_job
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [JobWorker] - %(message)s', handlers=[logging.FileHandler('/media/bodega/procesador/logs/job_worker.log'), logging.StreamHandler()])
+logger = logging.getLogger(__name__)
+
+SCRIPTS_DIR = '/media/bodega/procesador/scripts'
+VENV_PYTHON = '/media/bodega/procesador/bin/python'
+TXT_WORKERS = int(os.environ.get('DNC_TXT_WORKERS', '1'))  # Parallel processes for DNC .txt loads
+POLL_INTERVAL = 2
+RECOVERY_INTERVAL = job_queue.HEARTBEAT_TTL
+# file_type -> (processor module, class, constructor kwargs); in subprocess mode the kwargs become the script's flags
+PROCESSORS = {
+    'txt': ('process_txt', 'TXTProcessor', {'workers': TXT_WORKERS}),
+    'suppression_xlsx': ('process_xlsx', 'XLSXProcessor', {}),
+    'suppression_csv': ('process_csv', 'CSVProcessor', {}),
+    'suppression_csv_delta': ('process_csv', 'CSVProcessor', {'load_mode': 'delta'}),
+    'sales_xlsx': ('process_sales', 'SalesProcessor', {}),
+    'sales_csv': ('process_sales_csv', 'SalesCSVProcessor', {}),
+    'scrub_list': ('scrub_list', 'ListScrubber', {}),
+}
+
+
+def run_subprocess(spec):
+    module, _, kwargs = PROCESSORS[spec['file_type']]
+    command = [VENV_PYTHON, os.path.join(SCRIPTS_DIR, f'{module}.py'), '--file-path', spec['file_path'], '--job-id', spec['job_id']]
+    for name, value in kwargs.items(): command += [f"--{name.replace('_', '-')}", str(value)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0: raise RuntimeError(result.stderr[-2000:] or f'Exit code {result.returncode}')
+    logger.info(f"Script for job {spec['job_id']} completed. STDOUT: {result.stdout}")
+
+
+# --- Warm mode: state of each resident process ---
+_engine = _redis = None
+_schema_ready = False
+
+def _import_processor(module_name):
+    """
+    Imports a processor module without letting its logging.basicConfig() go unused: the root logger is already set up
+    here, so the handlers the module installs (its own log file) are moved to the module's logger instead.
+    """
+    root = logging.getLogger()
+    saved, root.handlers = root.handlers, []
+    try:
+        importlib.import_module(module_name)
+    finally:
+        own, root.handlers = root.handlers, saved
+    if own:
+        module_logger = logging.getLogger(module_name)
+        module_logger.handlers, module_logger.propagate = own, False
+
+def _discard_session(dbapi_connection, connection_record):
+    """
+    Pool checkin hook of the warm engine: a connection outlives the job that used it, so its session state (temp
+    staging tables, SET values, prepared statements) is dropped before the next job can check it out.
+    """
+    if dbapi_connection is None: return
+    try:
+        dbapi_connection.rollback()
+        dbapi_connection.autocommit = True  # DISCARD ALL can't run inside a transaction
+        cursor = dbapi_connection.cursor()
+        cursor.execute('DISCARD ALL')
+        cursor.close()
+        dbapi_connection.autocommit = False
+    except Exception as e:
+        logger.error(f"Could not reset a pooled connection, closing it: {e}")
+        connection_record.invalidate(e)
+
+def _init_warm_process():
+    global _engine, _redis, _schema_ready
+    # Stopping is the parent's job: it stops claiming and waits for the running jobs.
+    signal.signal(signal.SIGINT, signal.SIG_IGN); signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    for module_name in dict.fromkeys(module for module, _, _ in PROCESSORS.values()): _import_processor(module_name)
+    from schema import ensure_all_schemas
+    from sqlalchemy import event
+    _engine = create_db_engine(pool_size=2, max_overflow=2, pool_pre_ping=True)
+    event.listen(_engine, 'checkin', _discard_session)
+    _redis = create_redis()
+    try:
+        # If the database is down the process still starts; each processor checks its table when it runs.
+        raw_conn = _engine.raw_connection()
+        try:
+            ensure_all_schemas(raw_conn.cursor())
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+        _schema_ready = True
+    except Exception as e:
+        logger.error(f"Schema check failed in warm process {os.getpid()}; processors will check it per job: {e}")
+    logger.info(f"Warm process {os.getpid()} ready.")
+
+def run_in_warm_process(spec):
+    module, class_name, kwargs = PROCESSORS[spec['file_type']]
+    processor = getattr(sys.modules[module], class_name)(spec['job_id'], **kwargs)
+    processor.engine, processor.redis_client = _engine, _redis
+    if _schema_ready: processor.verify_schema = False
+    start = time.time()
+    processor.process_file(spec['file_path'])
+    logger.info(f"Job {spec['job_id']} finished in warm process {os.getpid()} after {time.time() - start:.1f}s.")
+
+
+class JobWorker:
+    def __init__(self, slots, limits, mode='warm', max_jobs=50):
+        self.slots = slots
+        self.limits = limits
+        self.mode = mode
+        self.max_jobs = max_jobs
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.redis_client = create_redis()
+        self.stopping = threading.Event()
+
+    def new_executor(self):
+        if self.mode == 'subprocess': return ThreadPoolExecutor(max_workers=self.slots)
+        # spawn: max_tasks_per_child can't be used with fork, and a fresh process doesn't inherit this one's sockets
+        return ProcessPoolExecutor(max_workers=self.slots, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_warm_process, max_tasks_per_child=self.max_jobs)
+
+    def start_job(self, executor, spec):
+        logger.info(f"Starting job {spec['job_id']} ({spec['file_type']}, attempt {spec['attempts']}, {self.mode}).")
+        write_job(self.redis_client, spec['job_id'], status='processing', queue_position=None, queue_length=None, message='Iniciando procesamiento...')
+        future = executor.submit(run_subprocess if self.mode == 'subprocess' else run_in_warm_process, spec)
+        future.add_done_callback(lambda f: self.job_done(spec, f))
+        return future
+
+    def job_done(self, spec, future):
+        job_id = spec['job_id']
+        try:
+            error = future.exception()
+            if error:
+                logger.error(f"Job {job_id} failed: {error}")
+                # The processors record their own failures; this covers crashes before they could.
+                if read_job(self.redis_client, job_id).get('status') not in ('completed', 'failed'):
+                    message = 'El proceso del worker terminó inesperadamente.' if isinstance(error, BrokenProcessPool) else str(error)
+                    write_job(self.redis_client, job_id, status='failed', message=message)
+        except Exception as e:
+            logger.error(f"Could not record the result of job {job_id}: {e}")
+        finally:
+            job_queue.finish(self.redis_client, job_id)
+            job_queue.refresh_positions(self.redis_client)
+
+    def heartbeat(self):
+        self.redis_client.setex(job_queue.heartbeat_key(self.worker_id), job_queue.HEARTBEAT_TTL, json.dumps({'slots': self.slots, 'mode': self.mode, 'at': time.time()}))
+
+    def serve(self):
+        logger.info(f"Worker {self.worker_id} started with {self.slots} {self.mode} slots, limits {self.limits}.")
+        active, last_recovery = set(), 0.0
+        executor = self.new_executor()
+        try:
+            while not self.stopping.is_set():
+                try:
+                    self.heartbeat()
+                    if time.time() - last_recovery >= RECOVERY_INTERVAL:
+                        job_queue.recover_orphans(self.redis_client); last_recovery = time.time()
+                    active = {f for f in active if not f.done()}
+                    spec = job_queue.claim(self.redis_client, self.worker_id, self.limits) if len(active) < self.slots else None
+                    if spec:
+                        job_queue.refresh_positions(self.redis_client)
+                        try:
+                            active.add(self.start_job(executor, spec))
+                        except BrokenProcessPool:
+                            # A warm process died (e.g. killed for memory); its jobs were failed by job_done. Start a new pool.
+                            logger.error("Warm process pool broken; starting a new one.")
+                            executor.shutdown(wait=False)
+                            executor, active = self.new_executor(), set()
+                            active.add(self.start_job(executor, spec))
+                        continue
+                    # Nothing to start: wait for an enqueue or a finished job (or a slot/limit to free up on the next poll)
+                    self.redis_client.brpop(job_queue.WAKEUP_KEY, timeout=POLL_INTERVAL)
+                except Exception as e:
+                    logger.error(f"Worker loop error: {e}")
+                    self.stopping.wait(POLL_INTERVAL)
+            logger.info(f"Stopping: waiting for {sum(not f.done() for f in active)} running jobs.")
+            while any(not f.done() for f in active):
+                self.heartbeat(); time.sleep(POLL_INTERVAL)
+        finally:
+            executor.shutdown(wait=True)
+        self.redis_client.delete(job_queue.heartbeat_key(self.worker_id))
+        logger.info(f"Worker {self.worker_id} stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run queued processing jobs')
+    parser.add_argument('--slots', type=int, default=int(os.environ.get('JOB_WORKER_SLOTS', '3')), help='Jobs this worker runs at once')
+    parser.add_argument('--mode', choices=['warm', 'subprocess'], default=os.environ.get('JOB_WORKER_MODE', 'warm'),
+                        help='warm: resident processes run the processor classes in-process (default); subprocess: one interpreter per job')
+    parser.add_argument('--max-jobs', type=int, default=int(os.environ.get('JOB_WORKER_MAX_JOBS', '50')), help='Jobs a warm process runs before it is replaced')
+    args = parser.parse_args()
+    worker = JobWorker(max(1, args.slots), job_queue.parse_limits(os.environ.get('JOB_CONCURRENCY')), args.mode, max(1, args.max_jobs))
+    for sig in (signal.SIGTERM, signal.SIGINT): signal.signal(sig, lambda *_: worker.stopping.set())
+    worker.serve()
+
+if __name__ == '__main__':
+    main()
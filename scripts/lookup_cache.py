@@ -0,0 +1,80 @@
+# /media/bodega/procesador/scripts/lookup_cache.py
+"""
+Read-through Redis cache for number lookups (the same Redis that holds the job:* keys).
+
+Entries live under lookup:<kind>:<number> and store the result together with the generation of every table it
+was read from. Each ingest processor bumps its table's generation (lookup_gen:<table>) when it finishes, so an
+entry read before a reload no longer matches and is treated as a miss; there is nothing to delete.
+Results that found nothing are cached too, with a shorter TTL. Hit/miss counts per kind go to the
+lookup_cache:stats hash.
+"""
+import json, os, logging
+
+TTL = int(os.environ.get('LOOKUP_CACHE_TTL', '300'))
+NEGATIVE_TTL = int(os.environ.get('LOOKUP_CACHE_NEGATIVE_TTL', '60'))
+STATS_KEY = 'lookup_cache:stats'
+
+logger = logging.getLogger(__name__)
+
+
+def generation_key(table):
+    return f'lookup_gen:{table}'
+
+
+def bump_generation(redis_client, *tables):
+    """Called by the processors after a load changes `tables`; every cached lookup that read them becomes stale."""
+    try:
+        pipe = redis_client.pipeline()
+        for table in tables: pipe.incr(generation_key(table))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Could not bump lookup cache generation for {tables}: {e}")
+
+
+class LookupCache:
+    def __init__(self, redis_client, ttl=TTL, negative_ttl=NEGATIVE_TTL, dumps=json.dumps):
+        self.redis, self.ttl, self.negative_ttl, self.dumps = redis_client, ttl, negative_ttl, dumps
+
+    def get_or_load(self, kind, tables, number, loader):
+        """
+        Returns the cached result for `number`, or calls loader() -> (result, found) and caches it.
+        Results go through `dumps` on both paths, so a hit and a miss return the same JSON-compatible value.
+        Redis errors fall back to calling the loader.
+        """
+        key = f'lookup:{kind}:{number}'
+        try:
+            pipe = self.redis.pipeline()
+            pipe.mget([generation_key(t) for t in tables])
+            pipe.get(key)
+            generations, cached = pipe.execute()
+            generations = [g or '0' for g in generations]
+            if cached:
+                entry = json.loads(cached)
+                if entry['gen'] == generations:
+                    self.redis.hincrby(STATS_KEY, f'{kind}:hits', 1)
+                    return entry['result']
+        except Exception as e:
+            logger.error(f"Lookup cache read failed, querying the database: {e}")
+            return json.loads(self.dumps(loader()[0]))
+
+        result, found = loader()
+        payload = self.dumps(result)
+        try:
+            pipe = self.redis.pipeline()
+            pipe.setex(key, self.ttl if found else self.negative_ttl, f'{{"gen": {json.dumps(generations)}, "result": {payload}}}')
+            pipe.hincrby(STATS_KEY, f'{kind}:misses', 1)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Lookup cache write failed: {e}")
+        return json.loads(payload)
+
+    def stats(self):
+        """{kind: {'hits', 'misses', 'hit_ratio'}} from the shared counters."""
+        counters, result = self.redis.hgetall(STATS_KEY), {}
+        for field, value in counters.items():
+            kind, _, counter = field.rpartition(':')
+            result.setdefault(kind, {'hits': 0, 'misses': 0})[counter] = int(value)
+        for values in result.values():
+            total = values['hits'] + values['misses']
+            values['hit_ratio'] = round(values['hits'] / total, 4) if total else 0.0
+        return result
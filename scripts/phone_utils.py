@@ -0,0 +1,95 @@
+# /media/bodega/procesador/scripts/phone_utils.py
+"""
+Normalización de números telefónicos compartida por todos los procesadores y las rutas /api/*search.
+
+Reglas (iguales en todas partes):
+  - Se quitan todos los caracteres que no son dígitos.
+  - 10 dígitos: se usan tal cual. 11 dígitos que empiezan por 1: se quita el código de país.
+  - El resultado debe ser un número NANP válido: área (NPA) y central (NXX) empiezan por 2-9 y el área no es N11.
+Los números inválidos se devuelven como INVALID (0) en los arreglos int64 para mantener la alineación con las filas.
+"""
+import re
+import numpy as np
+
+INVALID = 0
+_NON_DIGITS = re.compile(r'\D')
+_PAIR = re.compile(r'^1?(\d{10})(?:1?(\d{10}))?')
+
+
+def to_nanp(values):
+    """Valida un arreglo de enteros ya extraídos. Quita el '1' inicial y devuelve int64 con INVALID donde no aplica."""
+    v = np.asarray(values, dtype=np.int64)
+    v = np.where((v >= 10**10) & (v < 2 * 10**10), v - 10**10, v)
+    npa, nxx = v // 10**7, (v // 10**4) % 1000
+    ok = (v >= 2 * 10**9) & (v < 10**10) & (npa % 100 != 11) & (nxx >= 200)
+    return np.where(ok, v, INVALID)
+
+
+def normalize_series(values):
+    """Normaliza una columna completa (Series, lista o arreglo) y devuelve un arreglo int64 alineado con la entrada."""
+    import pandas as pd
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        # Columnas numéricas de Excel: 3055551234.0 no debe convertirse en '30555512340'.
+        numeric = s.to_numpy(dtype='float64', na_value=np.nan)
+        ok = np.isfinite(numeric) & (numeric >= 0) & (numeric < 2 * 10**10)
+        return to_nanp(np.where(ok, numeric, 0).astype(np.int64))
+    digits = s.astype(str).str.replace(r'\.0+$', '', regex=True).str.replace(r'\D', '', regex=True)
+    ok = digits.str.len().isin([10, 11]).to_numpy()
+    result = np.zeros(len(s), dtype=np.int64)
+    result[ok] = digits[ok].astype('int64').to_numpy()
+    return to_nanp(result)
+
+
+def split_pair_series(values):
+    """
+    Para celdas con dos números (principal y alterno), pegados o con separadores. Devuelve (principal, alterno) int64.
+    Sobre los dígitos de la celda se toman dos números de 10 dígitos, cada uno con su '1' de país opcional: un área
+    NANP nunca empieza por 1, así que un '1' donde empieza un número solo puede ser el código de país.
+    """
+    import pandas as pd
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    digits = s.where(s.notna(), '').astype(str).str.replace(r'\D', '', regex=True)
+    pair = digits.str.extract(_PAIR)
+    return normalize_series(pair[0]), normalize_series(pair[1])
+
+
+def numbers_from_bytes(data):
+    """
+    Extrae y normaliza el primer campo (antes de la primera coma) de cada línea de un bloque de bytes.
+    El bloque debe contener líneas completas. Devuelve solo los números válidos como int64.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == 10)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [buf.size]))
+    if starts[-1] == buf.size: starts, ends = starts[:-1], ends[:-1]
+    if not starts.size: return np.empty(0, dtype=np.int64)
+    # Fin del primer campo de cada línea: la primera coma dentro de la línea, o el fin de línea.
+    commas = np.flatnonzero(buf == 44)
+    field_end = np.minimum(np.append(commas, buf.size)[np.searchsorted(commas, starts)], ends)
+    # Marca con 1 los bytes entre la primera coma y el fin de la línea para ignorar sus dígitos.
+    with_comma = np.flatnonzero(field_end < ends)
+    marks = np.zeros(buf.size, dtype=np.int8)
+    marks[field_end[with_comma]] += 1
+    following = with_comma + 1
+    marks[starts[following[following < starts.size]]] -= 1
+    digit_mask = (buf >= 48) & (buf <= 57) & (np.cumsum(marks, dtype=np.int8) == 0)
+
+    digits = buf[digit_mask] - 48
+    counts = np.add.reduceat(digit_mask, starts, dtype=np.int64)
+    first_index = np.cumsum(counts) - counts
+    values = np.zeros(starts.size, dtype=np.int64)
+    for width in (10, 11):
+        lines = np.flatnonzero(counts == width)
+        values[lines] = digits[first_index[lines][:, None] + np.arange(width)].astype(np.int64) @ (10 ** np.arange(width - 1, -1, -1, dtype=np.int64))
+    values = to_nanp(values)
+    return values[values != INVALID]
+
+
+def normalize_number(value):
+    """Versión escalar para las rutas de búsqueda. Devuelve int o None."""
+    digits = _NON_DIGITS.sub('', str(value or ''))
+    if len(digits) not in (10, 11): return None
+    number = int(to_nanp(np.array([int(digits)], dtype=np.int64))[0])
+    return number if number != INVALID else None
@@ -0,0 +1,34 @@
+# /media/bodega/procesador/scripts/processor_base.py
+"""
+What every processor class shares: the Redis/PostgreSQL handles (created on first use, see connections.py), the
+job's progress reporter, and invalidating cached lookups of the table it loads once a job ends.
+"""
+from functools import cached_property
+from connections import create_redis, create_db_engine
+from job_records import ProgressReporter
+from lookup_cache import bump_generation
+
+
+class BaseProcessor:
+    verify_schema = True  # job_worker.py's warm processes check every table once at startup and turn this off
+    table = None  # Lookup table the processor loads
+    current_is_rows = True  # False when the progress `current` counts something else (bytes of a DNC file)
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    @cached_property
+    def redis_client(self): return create_redis()
+
+    @cached_property
+    def engine(self): return create_db_engine()
+
+    @cached_property
+    def progress(self): return ProgressReporter(self.redis_client, self.job_id, current_is_rows=self.current_is_rows)
+
+    def update_progress(self, current, total, status='processing', message=None, **extra):
+        self.progress.update(current, total, status, message, **extra)
+
+    def invalidate_lookups(self):
+        """Cached lookups that read the loaded table are stale now (also after a partial, failed load)."""
+        bump_generation(self.redis_client, self.table)
@@ -0,0 +1,122 @@
+# /media/bodega/procesador/scripts/schema.py
+"""
+DDL compartido por los procesadores y la app web. Todas las sentencias son idempotentes.
+
+suppression_records guarda los commodities como un conjunto normalizado (TEXT[] ordenado y sin duplicados)
+en lugar de una cadena unida con ' and '. Las búsquedas siguen devolviendo la columna 'commodity' como texto.
+"""
+
+UNKNOWN_COMMODITY = 'UNKNOWN COMMODITY. CONTACT ADMIN'
+
+DNC_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS dnc_records (
+        number BIGINT PRIMARY KEY,
+        state VARCHAR(10),
+        created_at TIMESTAMP DEFAULT NOW()
+    );
+    """,
+]
+
+SUPPRESSION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS suppression_records (
+        number BIGINT PRIMARY KEY,
+        commodities TEXT[] NOT NULL DEFAULT '{}',
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+    """,
+    # Unión de conjuntos: sin duplicados, ordenado, y el valor por defecto solo sobrevive si no hay otro commodity.
+    f"""
+    CREATE OR REPLACE FUNCTION merge_commodities(current_set TEXT[], incoming TEXT[]) RETURNS TEXT[]
+    LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE WHEN cardinality(merged) > 1 THEN array_remove(merged, '{UNKNOWN_COMMODITY}') ELSE merged END
+        FROM (SELECT ARRAY(SELECT DISTINCT c COLLATE "C" FROM unnest(current_set || incoming) AS t(c) WHERE c IS NOT NULL ORDER BY 1) AS merged) m
+    $$;
+    """,
+    # Migración de tablas antiguas: 'Gas and Electric' -> {Electric,Gas}, el mismo conjunto que escribe merge_commodities
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = 'suppression_records' AND column_name = 'commodity') THEN
+            ALTER TABLE suppression_records ADD COLUMN IF NOT EXISTS commodities TEXT[];
+            UPDATE suppression_records SET commodities = merge_commodities('{}', string_to_array(commodity, ' and '));
+            ALTER TABLE suppression_records DROP COLUMN commodity;
+            ALTER TABLE suppression_records ALTER COLUMN commodities SET DEFAULT '{}';
+            UPDATE suppression_records SET commodities = '{}' WHERE commodities IS NULL;
+            ALTER TABLE suppression_records ALTER COLUMN commodities SET NOT NULL;
+        END IF;
+    END $$;
+    """,
+    # Huella del último archivo cargado completo (modos swap/delta); permite saltarse una carga idéntica.
+    """
+    CREATE TABLE IF NOT EXISTS ingest_fingerprints (
+        table_name TEXT PRIMARY KEY,
+        fingerprint TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+    """,
+]
+
+SALES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS sales_records (
+        primary_number BIGINT PRIMARY KEY,
+        sale_date DATE,
+        alternate_number BIGINT,
+        provider TEXT,
+        commodity TEXT,
+        comments TEXT,
+        updated_at TIMESTAMP DEFAULT NOW()
+    );
+    """,
+]
+
+SALES_COLUMNS = ['primary_number', 'sale_date', 'alternate_number', 'provider', 'commodity', 'comments']
+
+
+# Búsqueda combinada por número: (tabla, columna clave, [(nombre, expresión con {t} = alias)]).
+# suppression mantiene 'commodity' como texto para las plantillas y clientes existentes.
+# La clave va primero y llega NULL cuando el número no está en esa tabla.
+LOOKUP_SOURCES = {
+    'dnc': ('dnc_records', 'number', [('number', '{t}.number'), ('state', '{t}.state'), ('created_at', '{t}.created_at')]),
+    'suppression': ('suppression_records', 'number', [('number', '{t}.number'), ('commodity', "array_to_string({t}.commodities, ' and ')"),
+                                                      ('commodities', '{t}.commodities'), ('updated_at', '{t}.updated_at')]),
+    'sales': ('sales_records', 'primary_number', [(c, '{t}.' + c) for c in SALES_COLUMNS + ['updated_at']]),
+}
+
+
+def combined_lookup_sql(sources, param=':num'):
+    """Una sola consulta (un viaje a la base) que busca un número en varias tablas con LEFT JOIN; `param` es el marcador del número."""
+    columns = ', '.join(f"{expr.format(t=alias)} AS {alias}__{name}" for alias in sources for name, expr in LOOKUP_SOURCES[alias][2])
+    joins = ''.join(f" LEFT JOIN {LOOKUP_SOURCES[alias][0]} {alias} ON {alias}.{LOOKUP_SOURCES[alias][1]} = q.num" for alias in sources)
+    return f"SELECT {columns} FROM (SELECT CAST({param} AS BIGINT) AS num) q{joins}"
+
+
+def split_lookup_row(row, sources):
+    """Convierte la fila de combined_lookup_sql (mapping) en {fuente: dict de columnas o None}."""
+    result = {}
+    for alias in sources:
+        values = {name: row[f'{alias}__{name}'] for name, _ in LOOKUP_SOURCES[alias][2]}
+        result[alias] = values if values[LOOKUP_SOURCES[alias][2][0][0]] is not None else None
+    return result
+
+
+def ensure_dnc_schema(cursor):
+    """Crea dnc_records si no existe usando un cursor psycopg2."""
+    for statement in DNC_SCHEMA: cursor.execute(statement)
+
+
+def ensure_all_schemas(cursor):
+    """Las tres tablas de búsqueda; la app lo ejecuta al arrancar para no tener que tolerar tablas faltantes en cada consulta."""
+    ensure_dnc_schema(cursor); ensure_suppression_schema(cursor); ensure_sales_schema(cursor)
+
+
+def ensure_suppression_schema(cursor):
+    """Crea o migra suppression_records usando un cursor psycopg2 (engine.raw_connection().cursor())."""
+    for statement in SUPPRESSION_SCHEMA: cursor.execute(statement)
+
+
+def ensure_sales_schema(cursor):
+    """Crea sales_records si no existe usando un cursor psycopg2."""
+    for statement in SALES_SCHEMA: cursor.execute(statement)
@@ -0,0 +1,139 @@
+# /media/bodega/procesador/scripts/scrub_list.py
+"""
+Depura una lista de leads (.csv o .xlsx) contra dnc_records, suppression_records y sales_records.
+
+Paso 1: se leen los números por bloques y se copian a una tabla temporal (row_id, number).
+Paso 2: una sola consulta en la base de datos marca las filas bloqueadas (DNC, supresión, venta, inválido o duplicado);
+        las demás son llamables (anti-join).
+Paso 3: se vuelve a leer el archivo y cada fila se escribe en exports/<job_id>_callable.csv o exports/<job_id>_blocked.csv.
+"""
+import argparse, io, os, traceback, logging
+from processor_base import BaseProcessor
+from phone_utils import normalize_series, INVALID
+from bulk_load import copy_dataframe
+from xlsx_reader import open_sheet, iter_batches
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.FileHandler('/media/bodega/procesador/logs/scrub_processing.log'), logging.StreamHandler()])
+logger = logging.getLogger(__name__)
+
+EXPORT_FOLDER = '/media/bodega/procesador/exports'
+CHUNK_SIZE = 100000  # Filas por bloque leído de la lista
+SCRUB_TABLES = {'dnc_records': ('number', 'dnc'), 'suppression_records': ('number', 'suppression'), 'sales_records': ('primary_number', 'sale')}
+
+
+def export_paths(job_id):
+    """Rutas de los dos archivos que genera un job de depuración."""
+    return {kind: os.path.join(EXPORT_FOLDER, f'{job_id}_{kind}.csv') for kind in ('callable', 'blocked')}
+
+
+def iter_lead_batches(file_path):
+    """Lee la lista por bloques (todo como texto). Devuelve (DataFrame, fracción del archivo leída)."""
+    if file_path.lower().endswith('.xlsx'):
+        estimated, rows = open_sheet(file_path)
+        read = 0
+        for batch in iter_batches(rows, batch_size=CHUNK_SIZE, as_str=True):
+            read += len(batch)
+            yield batch.fillna(''), min(read / estimated, 1.0) if estimated else 0.0
+        return
+    import pandas as pd
+    file_size = os.path.getsize(file_path) or 1
+    with open(file_path, 'rb') as f:
+        first_line = f.readline().decode('utf-8-sig', errors='replace')
+        f.seek(0)
+        sep = ';' if first_line.count(';') > first_line.count(',') else ','
+        for chunk in pd.read_csv(f, sep=sep, encoding='utf-8-sig', dtype=str, keep_default_na=False, on_bad_lines='warn', chunksize=CHUNK_SIZE):
+            yield chunk, f.tell() / file_size
+
+
+def phone_column(columns):
+    """Columna del teléfono: la primera que mencione 'phone' o 'number'; si no hay, la primera del archivo."""
+    lowered = [str(c).lower() for c in columns]
+    return next((col for col, low in zip(columns, lowered) if 'phone' in low or 'number' in low), columns[0])
+
+
+class ListScrubber(BaseProcessor):
+
+    def blocked_rows(self, cursor):
+        """Una sola consulta: filas inválidas, duplicadas o presentes en alguna tabla. Devuelve Series row_id -> motivo."""
+        existing = []
+        for table, (key, reason) in SCRUB_TABLES.items():
+            cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (table,))
+            if cursor.fetchone()[0]: existing.append((table, key, reason))
+        joins = ''.join(f" LEFT JOIN {table} t{i} ON t{i}.{key} = l.number" for i, (table, key, _) in enumerate(existing))
+        reasons = ''.join(f", CASE WHEN t{i}.{key} IS NOT NULL THEN '{reason}' END" for i, (_, key, reason) in enumerate(existing))
+        matches = ''.join(f" OR t{i}.{key} IS NOT NULL" for i, (_, key, _) in enumerate(existing))
+        query = f"""
+            SELECT l.row_id, concat_ws('; ', CASE WHEN l.number IS NULL THEN 'invalid' END, CASE WHEN l.duplicate THEN 'duplicate' END{reasons})
+            FROM (SELECT row_id, number, number IS NOT NULL AND row_number() OVER (PARTITION BY number ORDER BY row_id) > 1 AS duplicate
+                  FROM scrub_leads) l{joins}
+            WHERE l.number IS NULL OR l.duplicate{matches}
+        """
+        buf = io.StringIO()
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", buf)
+        import pandas as pd
+        buf.seek(0)
+        blocked = pd.read_csv(buf, header=None, names=['row_id', 'reason'], dtype={'row_id': 'int64', 'reason': str})
+        return blocked.set_index('row_id')['reason']
+
+    def process_file(self, file_path):
+        try:
+            import pandas as pd
+            self.update_progress(0, 100, 'processing', 'Leyendo lista de leads...')
+            total_rows = 0
+            raw_conn = self.engine.raw_connection()
+            try:
+                cursor = raw_conn.cursor()
+                cursor.execute("CREATE TEMP TABLE scrub_leads (row_id BIGINT, number BIGINT);")
+                # PASO 1: números normalizados a la tabla temporal (NULL = inválido)
+                for batch, done in iter_lead_batches(file_path):
+                    numbers = normalize_series(batch[phone_column(list(batch.columns))])
+                    copy_dataframe(cursor, 'scrub_leads', pd.DataFrame({
+                        'row_id': range(total_rows, total_rows + len(batch)),
+                        'number': pd.Series(numbers, dtype='Int64').mask(numbers == INVALID),
+                    }))
+                    total_rows += len(batch)
+                    self.update_progress(int(done * 50), 100, 'processing', f'Leídas {total_rows:,} filas...')
+                if not total_rows: raise ValueError("La lista no contiene filas.")
+
+                # PASO 2: anti-join en la base de datos
+                self.update_progress(50, 100, 'processing', f'Cruzando {total_rows:,} filas con DNC, supresión y ventas...')
+                cursor.execute("ANALYZE scrub_leads;")
+                blocked = self.blocked_rows(cursor)
+                raw_conn.rollback()
+            finally:
+                raw_conn.close()
+
+            # PASO 3: separar las filas del archivo original en los dos exports
+            os.makedirs(EXPORT_FOLDER, exist_ok=True)
+            paths = export_paths(self.job_id)
+            start = 0
+            with open(paths['callable'], 'w', newline='', encoding='utf-8') as callable_out, open(paths['blocked'], 'w', newline='', encoding='utf-8') as blocked_out:
+                for batch, done in iter_lead_batches(file_path):
+                    reason = blocked.reindex(range(start, start + len(batch))).to_numpy()
+                    is_blocked = pd.notna(reason)
+                    batch[~is_blocked].to_csv(callable_out, index=False, header=start == 0)
+                    batch[is_blocked].assign(blocked_reason=reason[is_blocked]).to_csv(blocked_out, index=False, header=start == 0)
+                    start += len(batch)
+                    self.update_progress(50 + int(done * 50), 100, 'processing', f'Exportadas {start:,} de {total_rows:,} filas...')
+
+            blocked_count = len(blocked)
+            counts = blocked.str.split('; ').explode().value_counts().to_dict()
+            detail = ', '.join(f'{reason}: {count:,}' for reason, count in sorted(counts.items()))
+            completion_message = f"Depuración completa. Llamables: {total_rows - blocked_count:,}. Bloqueados: {blocked_count:,}" + (f" ({detail})" if detail else '')
+            logger.info(completion_message)
+            self.update_progress(100, 100, 'completed', completion_message,
+                                 exports={kind: os.path.basename(path) for kind, path in paths.items()},
+                                 callable_count=total_rows - blocked_count, blocked_count=blocked_count)
+        except Exception as e:
+            error_msg = f"ERROR FATAL: {e}\n{traceback.format_exc()}"
+            logger.error(error_msg)
+            self.update_progress(0, 100, 'failed', error_msg)
+
+def main():
+    parser = argparse.ArgumentParser(description='Depura una lista de leads contra DNC, supresión y ventas')
+    parser.add_argument('--file-path', required=True); parser.add_argument('--job-id', required=True)
+    args = parser.parse_args()
+    ListScrubber(args.job_id).process_file(args.file_path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# /media/bodega/procesador/scripts/xlsx_reader.py
+"""
+Streaming reader for the first sheet of an .xlsx workbook.
+
+pd.read_excel(engine='openpyxl') builds the whole workbook object model before returning, which costs 10-20x the
+file size in RAM. This reader walks the sheet row by row and yields DataFrames of `batch_size` rows instead:
+  - python-calamine (Rust reader) when it is installed,
+  - otherwise openpyxl in read_only mode, which parses the sheet XML lazily.
+The first non-empty row is the header. Trailing empty rows are dropped, like read_excel does.
+"""
+import math
+from importlib.util import find_spec
+
+# pandas and the workbook readers are imported when a sheet is actually read.
+HAS_CALAMINE = find_spec('python_calamine') is not None
+
+BATCH_SIZE = 5000
+
+
+def _cell(value):
+    """Same cell conversion as pd.read_excel: integral floats come back as int so 3055551234.0 stays '3055551234'."""
+    if isinstance(value, float):
+        if math.isnan(value): return None
+        if value.is_integer(): return int(value)
+    if value == '': return None
+    return value
+
+
+def _calamine_rows(file_path):
+    from python_calamine import CalamineWorkbook
+    sheet = CalamineWorkbook.from_path(file_path).get_sheet_by_index(0)
+    return sheet.total_height, sheet.iter_rows()
+
+
+def _openpyxl_rows(file_path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    # max_row comes from the <dimension> tag; some writers omit it, so it is only an estimate for progress.
+    total = sheet.max_row
+
+    def rows():
+        try:
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    return total, rows()
+
+
+def open_sheet(file_path):
+    """
+    Returns (estimated_data_rows, row_iterator) for the first sheet, using calamine when available.
+    Rows are tuples/lists of cell values; the estimate excludes the header and is 0 when the workbook doesn't record its size.
+    """
+    total, rows = (_calamine_rows if HAS_CALAMINE else _openpyxl_rows)(file_path)
+    return max((total or 0) - 1, 0), rows
+
+
+def iter_batches(rows, batch_size=BATCH_SIZE, as_str=False):
+    """
+    Groups the rows from open_sheet() into DataFrames of up to `batch_size` data rows, with the header row as column names.
+    as_str=True mimics read_excel(dtype=str): every non-empty cell becomes a string, empty cells stay NaN.
+    """
+    header, batch, blank = None, [], 0
+    for row in rows:
+        values = [_cell(v) for v in row]
+        if all(v is None for v in values):
+            blank += header is not None
+            continue
+        if header is None:
+            header = [str(v) if v is not None else f'Unnamed: {i}' for i, v in enumerate(values)]
+            continue
+        # Empty rows between data rows are kept (they count as skipped rows downstream); trailing ones are dropped.
+        batch.extend([[None] * len(header)] * blank)
+        batch.append(values[:len(header)] + [None] * (len(header) - len(values)))
+        blank = 0
+        if len(batch) >= batch_size:
+            yield _frame(batch, header, as_str)
+            batch = []
+    if batch: yield _frame(batch, header, as_str)
+
+
+def _frame(batch, header, as_str):
+    import pandas as pd
+    df = pd.DataFrame(batch, columns=header, dtype=object)
+    return df.astype(str).where(df.notna()) if as_str else df
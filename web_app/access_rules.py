@@ -0,0 +1,44 @@
+# /media/bodega/procesador/web_app/access_rules.py
+"""
+Reglas de acceso de las rutas /api/*search, compartidas por la app Flask y el servicio de búsqueda asíncrono
+(lookup_service.py): lista de IPs permitidas, horario laboral de Colombia y log de auditoría.
+Nada aquí hace llamadas de red; todo se resuelve con los encabezados de la petición y el reloj local.
+"""
+import os
+import logging
+import pytz
+from datetime import datetime
+
+ALLOWED_IPS = ['127.0.0.1', '186.115.102.248', '192.168.1.25'] # Asegúrate de que tu IP esté aquí
+BUSINESS_TZ = pytz.timezone('America/Bogota')
+IP_BLOCKED_ERROR = 'Acceso desde tu IP no está permitido.'
+OUT_OF_HOURS_ERROR = 'Acceso denegado: Fuera del horario laboral'
+
+
+def real_ip(headers, remote_addr):
+    """IP del cliente: la que reporta Cloudflare si la petición pasó por ahí, si no la de la conexión."""
+    return headers.get('CF-Connecting-IP') or remote_addr
+
+
+def ip_allowed(ip_address):
+    return ip_address in ALLOWED_IPS
+
+
+def within_business_hours(now=None):
+    """Lunes a viernes de 8:00 a 18:00 y sábados de 8:00 a 13:00, hora de Bogotá."""
+    now = now or datetime.now(BUSINESS_TZ)
+    is_weekday = 0 <= now.weekday() <= 4 and 8 <= now.hour < 18
+    is_saturday = now.weekday() == 5 and 8 <= now.hour < 13
+    return is_weekday or is_saturday
+
+
+def get_audit_logger(log_dir='/media/bodega/procesador/logs'):
+    """Logger 'search_audit' escribiendo en search_audit.log (se configura una sola vez por proceso)."""
+    audit_logger = logging.getLogger('search_audit')
+    if not audit_logger.handlers:
+        audit_handler = logging.FileHandler(os.path.join(log_dir, 'search_audit.log'))
+        audit_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        audit_logger.setLevel(logging.INFO)
+        audit_logger.addHandler(audit_handler)
+        audit_logger.propagate = False
+    return audit_logger
@@ -0,0 +1,45 @@
+# /media/bodega/procesador/web_app/gunicorn.conf.py
+"""
+Configuración de producción de la app Flask (app.py) con gunicorn.
+
+    cd /media/bodega/procesador && gunicorn -c web_app/gunicorn.conf.py
+
+preload_app importa app.py una sola vez en el proceso maestro (esquema verificado, filtro Bloom, copia de dnc_records
+y plantillas ya cargados) y luego hace fork de los workers, que comparten esas páginas copy-on-write. Cada worker
+descarta las conexiones de PostgreSQL/Redis heredadas del maestro y abre las suyas.
+
+Cada worker tiene su propio pool de SQLAlchemy (DB_POOL_SIZE + DB_MAX_OVERFLOW conexiones como máximo): ajustar
+WEB_WORKERS para no pasar de max_connections de PostgreSQL.
+Las búsquedas /api/search* de alto volumen las puede atender el servicio asíncrono (lookup_service.py) con uvicorn.
+"""
+import os
+
+wsgi_app = 'web_app.app:app'
+chdir = '/media/bodega/procesador'
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', '4'))
+# Hilos por worker: las búsquedas pasan casi todo el tiempo esperando a PostgreSQL/Redis
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', '8'))
+preload_app = True
+# El buscador TCPA (Selenium) puede tardar hasta ~90 s con el cerrojo de Redis tomado
+timeout = int(os.environ.get('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+# Reciclar workers de vez en cuando para acotar la memoria que cada uno va ensuciando
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', '5000'))
+max_requests_jitter = 500
+accesslog = '/media/bodega/procesador/logs/gunicorn_access.log'
+errorlog = '/media/bodega/procesador/logs/gunicorn_error.log'
+
+
+def when_ready(server):
+    # Con preload_app la app ya está importada en el maestro; esto corre antes del primer fork.
+    from web_app.app import preload_shared_state
+    preload_shared_state()
+    server.log.info("Estado compartido cargado en el maestro; iniciando workers.")
+
+
+def post_fork(server, worker):
+    from web_app.app import after_fork
+    after_fork()